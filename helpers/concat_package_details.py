@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+
+import argparse
+import logging
+from util.parse import write_package_details_jsonl
+
+logging.basicConfig(level=logging.INFO,
+        format='%(asctime)s | [%(levelname)s] : %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p')
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--details_dir",
+        type=str,
+        help="Folder containing json files that store google play metadata",
+        required=True)
+
+parser.add_argument(
+        '--output', default='package_details.jsonl',
+        type=argparse.FileType('w', bufsize=1 << 20),
+        help='Output file. Default: package_details.jsonl.')
+
+args = parser.parse_args()
+
+logging.info("Concatenating json files in {}".format(args.details_dir))
+n_packages = write_package_details_jsonl(args.details_dir, args.output)
+logging.info("{} packages written to {}".format(n_packages, args.output.name))
@@ -3,8 +3,7 @@
 import argparse
 import csv
 import logging
-import json
-from util.parse import parse_package_details, parse_package_to_repos_file
+from util.parse import parse_package_details_fields, parse_package_details_jsonl, parse_play_date
 from datetime import datetime
 
 logging.basicConfig(level=logging.INFO,
@@ -12,7 +11,7 @@ logging.basicConfig(level=logging.INFO,
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--start_date",
-        type=lambda d: datetime.strptime(d, '%Y-%m-%d'),
+        type=lambda d: datetime.strptime(d, '%Y-%m-%d').date(),
         help="Upload date. Only apps upload after this date will be retrived. Format required: YYYY-MM-DD",
         required=True)
 
@@ -21,15 +20,22 @@ parser.add_argument("--all_repos",
         help="A CSV file containg with following format: package_name,repository_name",
         required=True)
 
-parser.add_argument("--details_dir",
+details_source = parser.add_mutually_exclusive_group(required=True)
+details_source.add_argument("--details_dir",
         type=str,
-        help="Folder containing json files that store google play metadata",
-        required=True)
+        help="Folder containing json files that store google play metadata")
+
+details_source.add_argument("--details_jsonl",
+        type=str,
+        help="JSON lines file created by concat_package_details.py. Replaces --details_dir")
 
+parser.add_argument("--processes",
+        type=int, default=1,
+        help="Number of processes used to parse JSON files. Default: 1")
 
 parser.add_argument(
-        '--output', default=open('filtered_pkgs', 'w'),
-        type=argparse.FileType('w'),
+        '--output', default='filtered_pkgs',
+        type=argparse.FileType('w', bufsize=1 << 20),
         help='Output file. Default: filtered_pkgs')
 
 args = parser.parse_args()
@@ -37,9 +43,22 @@ args = parser.parse_args()
 
 details_dir = args.details_dir
 
-all_files =  parse_package_details(details_dir)
+all_repos_file = args.all_repos
+all_repos_reader = csv.reader(all_repos_file, delimiter=',')
+# Each row is: package, repo_name
+repos_by_pkg = {}
+for row in all_repos_reader:
+    if row:
+        repos_by_pkg.setdefault(row[0], []).append(row[1])
+n_candidates = len(repos_by_pkg)
+
+fields = ['details.appDetails.uploadDate']
+if args.details_jsonl:
+    all_files = parse_package_details_jsonl(args.details_jsonl, fields, set(repos_by_pkg))
+else:
+    all_files = parse_package_details_fields(details_dir, fields, args.processes, set(repos_by_pkg))
 analyzed = 0
-pkgs = []
+start_ordinal = args.start_date.toordinal()
 spinner = "/-\|"
 
 logging.debug("Retriving applicatios released after: {}".format(args.start_date))
@@ -48,35 +67,19 @@ for package_name, package_details in all_files:
     logging.debug(package_name)
 
     analyzed = analyzed + 1
-    print("\r {} {} apps analyzed".format(spinner[analyzed % 4], analyzed), end='', flush=True)
+    if analyzed % 256 == 0:
+        print("\r {} {} apps analyzed".format(spinner[analyzed // 256 % 4], analyzed), end='', flush=True)
    
     if package_details:
-        app_details = package_details.get('details').get('appDetails', None)
-  
-        upload_date = datetime.strptime(app_details.get('uploadDate'), "%b %d, %Y")
-
-        if upload_date > args.start_date:
-            pkgs.append(package_name)
-
-
-result = []
-
-
-all_repos_file = args.all_repos
-all_repos_reader = csv.DictReader(all_repos_file, delimiter=',', fieldnames=['package','repo_name'])
-all_repos = list(all_repos_reader)
-
-print("\nRetriving all possible repos")
+        upload_ordinal = parse_play_date(package_details['details.appDetails.uploadDate']).toordinal()
 
-total = len(all_repos)
-i = 0
-for row in all_repos:
-    i = i + 1
+        if upload_ordinal > start_ordinal:
+            for repo_name in repos_by_pkg[package_name]:
+                args.output.write("{},{}\n".format(package_name, repo_name))
 
-    workdone = i/total
-    print("\rProgress: [{0:50s}] {1:.1f}% {2}/{3}".format('#' * int(workdone * 50), workdone*100, i, total), end='', flush=True)
+    if analyzed == n_candidates:
+        # Each package has one JSON file. Skip listing remaining files.
+        break
 
-    if row['package'] in pkgs:
-        result.append("{},{}\n".format(row['package'], row['repo_name']))
 
-args.output.write(''.join(result))
+print("\r {} apps analyzed".format(analyzed))
@@ -4,8 +4,7 @@ import argparse
 import csv
 import logging
 import json
-from util.parse import parse_package_details, parse_package_to_repos_file
-from datetime import datetime
+from util.parse import parse_package_details_fields, parse_package_details_jsonl, parse_play_date
 
 logging.basicConfig(level=logging.INFO,
         format='%(asctime)s | [%(levelname)s] : %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p')
@@ -16,26 +15,31 @@ parser.add_argument("--package_list",
         help="The csv file that contins output the match process",
         required=True)
 
-parser.add_argument("--details_dir",
+details_source = parser.add_mutually_exclusive_group(required=True)
+details_source.add_argument("--details_dir",
         type=str,
-        help="Folder containing json files that store google play metadata",
-        required=True)
+        help="Folder containing json files that store google play metadata")
+
+details_source.add_argument("--details_jsonl",
+        type=str,
+        help="JSON lines file created by concat_package_details.py. Replaces --details_dir")
 
+parser.add_argument("--processes",
+        type=int, default=1,
+        help="Number of processes used to parse JSON files. Default: 1")
 
 parser.add_argument(
-        '--output', default=open('new_apps.json', 'w'),
-        type=argparse.FileType('w'),
+        '--output', default='new_apps.json',
+        type=argparse.FileType('w', bufsize=1 << 20),
         help='Output file. Default: new_apps.json.')
 
 args = parser.parse_args()
 csv_reader = csv.reader(args.package_list, delimiter=',')
 
-matched_pkgs = []
-matched_dict = {}
-
-for row in csv_reader:
-    matched_pkgs.append(row[0].strip())
-    matched_dict[row[0]] = "https://github.com/{}".format(row[1].strip())
+matched_dict = {
+        row[0].strip(): "https://github.com/{}".format(row[1].strip())
+        for row in csv_reader}
+matched_pkgs = set(matched_dict)
 
 args.package_list.close()
 
@@ -45,27 +49,38 @@ found = 0
 details_dir = args.details_dir
 
 
+fields = [
+        'title',
+        'promotionalDescription',
+        'details.appDetails.uploadDate',
+        'details.appDetails.versionCode',
+        'details.appDetails.versionString']
+
+if args.details_jsonl:
+    all_files = parse_package_details_jsonl(args.details_jsonl, fields, matched_pkgs)
+else:
+    all_files = parse_package_details_fields(details_dir, fields, args.processes, matched_pkgs)
+
 result = []
-for package_name, package_details in parse_package_details(details_dir):
+for package_name, package_details in all_files:
     if package_name in matched_pkgs:
         logging.debug(package_name)
 
         found = found + 1
 
-        workdone = found/n_matched
-        print("\rProgress: [{0:50s}] {1:.1f}% {2}/{3}".format('#' * int(workdone * 50), workdone*100, found, n_matched), end='', flush=True)
+        if found % 1000 == 0 or found == n_matched:
+            workdone = found/n_matched
+            print("\rProgress: [{0:50s}] {1:.1f}% {2}/{3}".format('#' * int(workdone * 50), workdone*100, found, n_matched), end='', flush=True)
        
-        app_details = package_details.get('details').get('appDetails', None)
-        
         relevant_info = {}
 
-        if app_details:
+        if package_details and package_details['details.appDetails.uploadDate']:
             relevant_info['package'] = package_name
-            relevant_info['name'] =  package_details.get('title')
-            relevant_info['summary'] =  package_details.get('promotionalDescription')
-            relevant_info['last_added_on'] =  str(datetime.strptime(app_details.get('uploadDate'), "%b %d, %Y").date())
-            relevant_info['last_version_number'] =  app_details.get('versionCode')
-            relevant_info['last_version_name'] =  app_details.get('versionString')
+            relevant_info['name'] =  package_details['title']
+            relevant_info['summary'] =  package_details['promotionalDescription']
+            relevant_info['last_added_on'] =  str(parse_play_date(package_details['details.appDetails.uploadDate']))
+            relevant_info['last_version_number'] =  package_details['details.appDetails.versionCode']
+            relevant_info['last_version_name'] =  package_details['details.appDetails.versionString']
             relevant_info['source_repo'] =  matched_dict.get(package_name)
             result.append(relevant_info)
         else:
@@ -75,4 +90,5 @@ for package_name, package_details in parse_package_details(details_dir):
             break
 
 
-print(json.dumps(result, indent=4, sort_keys=False), file=args.output)
+json.dump(result, args.output, indent=4, sort_keys=False)
+args.output.write('\n')
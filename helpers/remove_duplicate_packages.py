@@ -12,19 +12,19 @@ parser.add_argument("--package_list",
         required=True)
 
 parser.add_argument(
-        '--output', default=open('pkgs_one_manifest_repo', 'w'),
-        type=argparse.FileType('w'),
+        '--output', default='pkgs_one_manifest_repo',
+        type=argparse.FileType('w', bufsize=1 << 20),
         help='Output file. Default: pkgs_one_manifest_repo.')
 
 args = parser.parse_args()
 csv_reader = csv.reader(args.package_list, delimiter=',')
 next(csv_reader, None)
 
-lines = []
+n_lines = 0
+uniq_packages = set()
 for row in csv_reader:
-    lines.append("{}\n".format(row[0]))
-
-n_lines = len(lines)
+    n_lines += 1
+    uniq_packages.add(row[0])
 
 args.package_list.close()
 
@@ -32,10 +32,9 @@ logging.info("Extracting packages names")
 logging.info("{} packages found.".format(n_lines))
 logging.info("Removing duplicated packages")
 
-uniq_lines = set(lines)
-n_uniq = len(uniq_lines)
+n_uniq = len(uniq_packages)
 logging.info("{} packages remaining. {} packages duplicated removed".format(n_uniq, n_lines - n_uniq))
 
-args.output.write(''.join(sorted(uniq_lines)))
+args.output.writelines("{}\n".format(package) for package in sorted(uniq_packages))
 
 
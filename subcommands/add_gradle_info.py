@@ -57,7 +57,8 @@ def has_gradle_files(repo_name: str, outdir: str) -> bool:
         True if any *.gradle files exist with prefix <outdir>/<repo_name>/
     """
     pattern = os.path.join(outdir, repo_name, '**/*.gradle')
-    return len(glob.glob(pattern, recursive=True)) > 0
+    # Stop searching at the first match.
+    return next(glob.iglob(pattern, recursive=True), None) is not None
 
 
 def get_new_repo_name(repo_name: str, outdir: str) -> str:
@@ -11,7 +11,6 @@ import logging
 import os
 import sys
 from typing import Iterator
-from github3.models import GitHubError
 from github3.repos.contents import Contents
 from github3.search import CodeSearchResult
 from util.github_repo import RepoVerifier
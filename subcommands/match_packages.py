@@ -13,7 +13,8 @@ from typing import IO, Iterator, List, Tuple
 
 from util.github_repo import RepoVerifier
 from util.package import Package
-from util.parse import parse_package_details, parse_package_to_repos_file
+from util.parse import \
+    parse_package_details_parallel, parse_package_to_repos_file
 
 
 __log__ = logging.getLogger(__name__)
@@ -121,7 +122,8 @@ def match_play_and_github(
             }
     packages = parse_package_to_repos_file(package_to_repo)
 
-    for package_name, package_details in parse_package_details(details_dir):
+    for package_name, package_details in parse_package_details_parallel(
+            details_dir):
         stats['all'] += 1
         package = Package(package_name, package_details)
 
@@ -3,15 +3,23 @@
 Use -h or --help for more information.
 """
 import argparse
+from concurrent.futures import \
+    ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import csv
+import itertools
 import logging
 import os
-from typing import Dict, IO, List
+from typing import Callable, Dict, IO, Iterable, Iterator, List
 
-from util.neo4j import Neo4j, Node
+from neo4j.exceptions import ClientError, TransientError
+
+from util.neo4j import BATCH_SIZE, Neo4j, iter_batches
 from util.parse import \
+    intern_google_play_info, \
+    list_packages_with_details, \
     parse_google_play_info, \
-    parse_iso8601
+    parse_iso8601, \
+    split_packages
 
 
 __log__ = logging.getLogger(__name__)
@@ -21,32 +29,125 @@ NEO4J_HOST = 'bolt://localhost'
 NEO4J_PORT = 7687
 GITLAB_HOST = 'http://145.108.225.21'
 GITLAB_REPOSITORY_PATH = '/var/opt/gitlab/git-data/repositories/gitlab'
+TRANSACTION_ATTEMPTS = 3
+COMMITS_PER_TRANSACTION = 10 * BATCH_SIZE
+# Connections are reused for the whole import. Recycle them once in a while
+# and give up waiting for a free connection instead of hanging forever. The
+# pool is enlarged if more threads need connections.
+DRIVER_CONFIG = {
+    'max_connection_pool_size': 50,
+    'max_connection_lifetime': 3600,
+    'connection_acquisition_timeout': 60,
+    }
+
+QUERY_APP_NODES = '''
+    UNWIND {rows} AS package
+    MERGE (g:GooglePlayPage {docId: package})
+    CREATE (a:App {id: package})-[:PUBLISHED_AT]->(g)
+    '''
+
+QUERY_REPOSITORY_NODE = '''
+    CREATE (repo:GitHubRepository {repo_properties})
+    RETURN id(repo)
+    '''
+
+QUERY_FORK_RELATIONSHIPS = '''
+    MATCH (fork:GitHubRepository), (parent:GitHubRepository)
+    WHERE fork.parentId = parent.id OR fork.sourceId = parent.id
+    CREATE (fork)-[:FORKS]->(parent)
+    '''
+
+QUERY_GOOGLE_PLAY_PAGE_NODES = '''
+    UNWIND {rows} AS row
+    CREATE (page:GooglePlayPage)
+    SET page = row
+    '''
+
+QUERY_TAG_NODES = '''
+    MATCH (repo:GitHubRepository) WHERE id(repo) = {repo_id}
+    UNWIND {rows} AS row
+    MERGE (commit:Commit {id: row.commit_hash})
+    CREATE
+        (tag:Tag)-[:BELONGS_TO]->(repo),
+        (tag)-[:POINTS_TO]->(commit)
+    SET tag = row.tag_details
+    '''
+
+QUERY_BRANCH_NODES = '''
+    MATCH (repo:GitHubRepository) WHERE id(repo) = {repo_id}
+    UNWIND {rows} AS row
+    MERGE (commit:Commit {id: row.commit_hash})
+    CREATE
+        (branch:Branch)-[:BELONGS_TO]->(repo),
+        (branch)-[:POINTS_TO]->(commit)
+    SET branch = row.branch_details
+    '''
+
+QUERY_CONTRIBUTOR_NODES = '''
+    UNWIND {rows} AS row
+    MERGE (contributor:Contributor {email: row.email})
+        ON CREATE SET contributor = row
+        ON MATCH SET contributor += row
+    '''
+
+QUERY_COMMIT_NODES = '''
+    MATCH (repo:GitHubRepository) WHERE id(repo) = {repo_id}
+    UNWIND {rows} AS row
+    MERGE (commit:Commit {id: row.commit.id})
+        ON CREATE SET commit = row.commit
+        ON MATCH SET commit += row.commit
+    WITH repo, row, commit
+    MATCH
+        (author:Contributor {email: row.author.email}),
+        (committer:Contributor {email: row.committer.email})
+    CREATE
+        (commit)-[:BELONGS_TO]->(repo),
+        (author)-[:AUTHORS {timestamp: row.authored_date}]->(commit),
+        (committer)-[:COMMITS {timestamp: row.committed_date}]->(commit)
+    FOREACH (parent_id IN row.parent_ids |
+        MERGE (parent:Commit {id: parent_id})
+        CREATE (commit)-[:PARENT]->(parent))
+    '''
+
+QUERY_IMPLEMENTED_BY = '''
+    MATCH (repo:GitHubRepository) WHERE id(repo) = {repo_id}
+    UNWIND {rows} AS row
+    MATCH (a:App {id: row.package})
+    MERGE (a)-[r:IMPLEMENTED_BY]->(repo)
+        ON CREATE SET r = row.properties
+        ON MATCH SET r += row.properties
+    '''
+
+
+def ensure_indexes(neo4j: Neo4j):
+    """Create indexes and constraints used by MERGE and MATCH queries.
+
+    Without them every MERGE scans all nodes of a label. Both statements are
+    no-ops if the index or constraint exists already. Neo4j refuses to create
+    a constraint if a plain index exists for the same property, e.g. in a
+    database populated by an earlier version. Keep the index in that case.
 
-
-def add_google_play_page_node(
-        package_name: str, neo4j: Neo4j, play_details_dir: str) -> Node:
-    """Create a node for an Google Play page.
-
-    Meta data of Google Play page is loaded from JSON file at
-    <play_details_dir>/<package_name>.json
-
-    :param str package_name:
-        Package name.
     :param Neo4j neo4j:
-        Neo4j instance to add nodes to.
-    :param str play_details_dir:
-        Name of directory to include JSON files from. Filenames in this
-        directory need to have .json extension. Filename without extension is
-        assumed to be package name for details contained in file.
-    :return Node:
-        Node created for Google Play page if JSON file exists, otherwise None.
+        Neo4j instance to create indexes in.
     """
-    google_play_info = parse_google_play_info(package_name, play_details_dir)
-    if not google_play_info:
-        __log__.warning('Cannot create GooglePlayPage node %s.', package_name)
-        return None
-    __log__.info('Create GooglePlayPage node for %s.', package_name)
-    return neo4j.create_node('GooglePlayPage', **google_play_info)
+    # :App and :GooglePlayPage nodes are created once per package.
+    for label, key in [
+            ('Commit', 'id'), ('Contributor', 'email'), ('App', 'id'),
+            ('GooglePlayPage', 'docId')]:
+        try:
+            # Results are fetched lazily. Consume it to raise errors here.
+            neo4j.run(
+                'CREATE CONSTRAINT ON (n:{label}) ASSERT n.{key} IS UNIQUE'
+                .format(label=label, key=key)).consume()
+        except ClientError as error:
+            __log__.warning(
+                'Cannot create constraint on :%s(%s): %s', label, key, error)
+    # A repository may be listed more than once.
+    try:
+        neo4j.run('CREATE INDEX ON :GitHubRepository(id)').consume()
+    except ClientError as error:
+        __log__.warning(
+            'Cannot create index on :GitHubRepository(id): %s', error)
 
 
 def format_repository_data(meta_data: dict, snapshot: dict) -> dict:
@@ -88,16 +189,11 @@ def add_fork_relationships(neo4j: Neo4j):
     :param Neo4j neo4j:
         Neo4j instance to add nodes to.
     """
-    query = '''
-        MATCH (fork:GitHubRepository), (parent:GitHubRepository)
-        WHERE fork.parentId = parent.id OR fork.sourceId = parent.id
-        CREATE (fork)-[:FORKS]->(parent)
-        '''
-    neo4j.run(query)
+    neo4j.run(QUERY_FORK_RELATIONSHIPS)
 
 
 def add_repository_node(
-        meta_data: dict, snapshots: List[dict], neo4j: Neo4j) -> Node:
+        meta_data: dict, snapshots: List[dict], neo4j: Neo4j) -> int:
     """Add a repository and link it to all apps imnplemented by it.
 
     Does not do anything if packages_names is empty or no :App node exists
@@ -109,103 +205,99 @@ def add_repository_node(
         List of snapshots data. Must be length 1.
     :param Neo4j neo4j:
         Neo4j instance to add nodes to.
-    :returns Node:
-        The node created for the repository.
+    :returns int:
+        ID of the node created for the repository.
     """
     snapshot = snapshots[0] if snapshots else {}
     repo_data = format_repository_data(meta_data, snapshot)
-    query = '''
-        CREATE (repo:GitHubRepository {repo_properties})
-        RETURN repo
-        '''
-    result = neo4j.run(query, repo_properties=repo_data)
+    result = neo4j.run(QUERY_REPOSITORY_NODE, repo_properties=repo_data)
     return result.single()[0]
 
 
-def add_tag_nodes(tags: List[dict], repo_node_id: int, neo4j: Neo4j):
+def add_tag_nodes(
+        tags: Iterable[dict], repo_node_id: int, neo4j: Neo4j,
+        batch_size: int = BATCH_SIZE):
     """Create nodes representing GIT tags of a repository.
 
     Creates a node for each tag and links it with the repository identified
     by repo_node_id and the commit the tag points to.
 
-    :param List[Dict[str, str]] tags:
+    :param Iterable[Dict[str, str]] tags:
         List of tag data.
     :param int repo_node_id:
         ID of node the tags should be linked to.
     :param Neo4j neo4j:
         Neo4j instance to add nodes to.
+    :param int batch_size:
+        Maximum number of tags to create with one query.
     """
-    for tag in tags:
-        parameters = {
+    rows = (
+        {
             'commit_hash': tag.get('commit_hash'),
-            'repo_id': repo_node_id,
             'tag_details': {
                 'name': tag.get('tag_name'),
                 'message': tag.get('tag_message'),
                 },
             }
+        for tag in tags)
 
-        neo4j.run(
-            '''
-            MATCH (repo:GitHubRepository) WHERE id(repo) = {repo_id}
-            MERGE (commit:Commit {id: {commit_hash}})
-            CREATE
-                (tag:Tag {tag_details})-[:BELONGS_TO]->(repo),
-                (tag)-[:POINTS_TO]->(commit)
-            ''', **parameters)
+    neo4j.run_batched(
+        QUERY_TAG_NODES, rows, batch_size, repo_id=repo_node_id)
 
 
-def add_branche_nodes(branches: List[dict], repo_node_id: int, neo4j: Neo4j):
+def add_branche_nodes(
+        branches: Iterable[dict], repo_node_id: int, neo4j: Neo4j,
+        batch_size: int = BATCH_SIZE):
     """Create nodes representing GIT branches of a repository.
 
     Creates a node for each branch and links it with the repository identified
     by repo_node_id and the commit the branch points to.
 
-    :param List[Dict[str, str]] branches:
+    :param Iterable[Dict[str, str]] branches:
         List of information on branches.
     :param int repo_node_id:
         ID of node the branches should be linked to.
     :param Neo4j neo4j:
         Neo4j instance to add nodes to.
+    :param int batch_size:
+        Maximum number of branches to create with one query.
     """
-    for branch in branches:
-        parameters = {
+    rows = (
+        {
             'commit_hash': branch.get('commit_hash'),
-            'repo_id': repo_node_id,
             'branch_details': {
                 'name': branch.get('branch_name'),
                 },
             }
+        for branch in branches)
 
-        neo4j.run(
-            '''
-            MATCH (repo:GitHubRepository) WHERE id(repo) = {repo_id}
-            MERGE (commit:Commit {id: {commit_hash}})
-            CREATE
-                (branch:Branch {branch_details})-[:BELONGS_TO]->(repo),
-                (branch)-[:POINTS_TO]->(commit)
-            ''', **parameters)
+    neo4j.run_batched(
+        QUERY_BRANCH_NODES, rows, batch_size, repo_id=repo_node_id)
 
 
-def add_commit_nodes(commits: List[dict], repo_node_id: int, neo4j: Neo4j):
+def add_commit_nodes(
+        commits: Iterable[dict], repo_node_id: int, neo4j: Neo4j,
+        batch_size: int = BATCH_SIZE):
     """Create nodes representing GIT commits of a repository.
 
     Creates a node for each commit and links it with  the repository identified
     by repo_node_id.
 
     Also creates relationships to author, committer and parent commits. Creates
-    each of these in turn unless they exist already.
+    each of these in turn unless they exist already. Contributors are merged
+    once per batch of commits before the commits themselves.
 
-    :param List[Dict[str, str]] commits:
+    :param Iterable[Dict[str, str]] commits:
         List of data of commits.
     :param int repo_node_id:
         ID of node the commits should be linked to.
     :param Neo4j neo4j:
         Neo4j instance to add nodes to.
+    :param int batch_size:
+        Maximum number of commits to create with one query.
     """
-    for commit in commits:
-        parameters = {
-            'repo_id': repo_node_id,
+    rows = (
+        {
             'commit': {
                 'id': commit.get('id'),
                 'short_id': commit.get('short_id'),
@@ -225,69 +317,23 @@ def add_commit_nodes(commits: List[dict], repo_node_id: int, neo4j: Neo4j):
                 },
             'authored_date': commit.get('authored_date'),
             'committed_date': commit.get('committed_date'),
+            # Root commits have no parents.
+            'parent_ids': [
+                parent for parent in commit.get('parent_ids').split(',')
+                if parent],
             }
+        for commit in commits)
 
-        neo4j.run(
-            '''
-            MATCH (repo:GitHubRepository) WHERE id(repo) = {repo_id}
-            MERGE (commit:Commit {id: {commit}.id})
-                ON CREATE SET commit = {commit}
-                ON MATCH SET commit += {commit}
-            MERGE (author:Contributor {email: {author}.email})
-                ON CREATE SET author = {author}
-                ON MATCH SET author += {author}
-            MERGE (committer:Contributor {email: {committer}.email})
-                ON CREATE SET committer = {committer}
-                ON MATCH SET committer += {committer}
-            CREATE
-                (commit)-[:BELONGS_TO]->(repo),
-                (author)-[:AUTHORS {timestamp: {authored_date}}]->(commit),
-                (committer)-[:COMMITS {timestamp: {committed_date}}]->(commit)
-            ''', **parameters)
-
-        for parent in commit.get('parent_ids').split(','):
-            neo4j.run(
-                '''
-                MATCH (c:Commit {id: {child}})
-                MERGE (p:Commit {id: {parent}})
-                CREATE (c)-[:PARENT]->(p)
-                ''', parent=parent, child=commit.get('id'))
-
-        __log__.debug('Created commit %s', parameters['commit']['id'])
-
-
-def add_paths_property(
-        properties: dict, repo_node_id: int, package_name: str, neo4j: Neo4j):
-    """Add path names as properties based on search.
-
-    Search a git repository and add file names which contain matches to an
-    :IMPLEMENTED_BY relationship matched agains package_name and repoe_node_id.
-
-    :param dict properties:
-        Mapping of property name to propertie values to be added to
-        relationship.
-    :param int repo_node_id:
-        Identifier for :GitHubRepository node which the :IMPLEMENTED_BY
-        relationship points to.
-    :param str package_name:
-        Package name of :App node.
-    :param Neo4j neo4j:
-        Neo4j instance to add nodes to.
-    """
-    parameters = {
-        'package': package_name,
-        'repo_id': repo_node_id,
-        'rel_properties': properties,
-        }
-    query = '''
-        MATCH
-            (a:App {id: {package}}), (repo:GitHubRepository)
-        WHERE id(repo) = {repo_id}
-        MERGE (a)-[r:IMPLEMENTED_BY]->(repo)
-        ON CREATE SET r = {rel_properties}
-        ON MATCH SET r += {rel_properties}
-        '''
-    neo4j.run(query, **parameters)
+    for batch in iter_batches(rows, batch_size):
+        # Most commits share few contributors. Merge each of them once per
+        # batch instead of twice per commit.
+        contributors = {}
+        for row in batch:
+            contributors[row['author']['email']] = row['author']
+            contributors[row['committer']['email']] = row['committer']
+        neo4j.run(QUERY_CONTRIBUTOR_NODES, rows=list(contributors.values()))
+        neo4j.run(QUERY_COMMIT_NODES, rows=batch, repo_id=repo_node_id)
+    __log__.debug('Created commits of repository node %d', repo_node_id)
 
 
 def add_implementation_properties(
@@ -297,7 +343,8 @@ def add_implementation_properties(
 
     Find Android manifest files and build system files for app in the
     repository and add their paths as properties to the IMPLEMENTED_BY
-    relationship.
+    relationship. All relationships of the repository are merged with one
+    query.
 
     :param List[Dict[str, str]] properties:
         A list of dictionaries. Each has a key 'package' and other keys that
@@ -310,19 +357,61 @@ def add_implementation_properties(
     :param Neo4j neo4j:
         Neo4j instance to add nodes to.
     """
+    rows = []
     if {pp['package'] for pp in properties} != set(packages):
         __log__.error(
             'Packages stored with paths do not match. '
             'Original: %s. Properties: %s', packages, properties)
         # Create empty IMPLEMENTED_BY relations to make sure all packages are
         # connected.
-        for package in packages:
-            add_paths_property({}, repo_node_id, package, neo4j)
+        rows += [
+            {'package': package, 'properties': {}} for package in packages]
 
     for attr in properties:
-        package = attr['package']
-        del attr['package']
-        add_paths_property(attr, repo_node_id, package, neo4j)
+        rows.append({
+            'package': attr['package'],
+            'properties': {
+                key: value for key, value in attr.items()
+                if key != 'package'},
+            })
+    neo4j.run_batched(QUERY_IMPLEMENTED_BY, rows, repo_id=repo_node_id)
+
+
+def iter_csv_rows(csv_file: IO[str]) -> Iterator[Dict[str, str]]:
+    """Iterate over rows of an open CSV file as dictionaries.
+
+    Like csv.DictReader but cheaper per row. Columns are named by the
+    header of the file. Empty lines are skipped.
+
+    :param IO[str] csv_file:
+        CSV file with header.
+    :returns Iterator[Dict[str, str]]:
+        Iterator over rows of CSV file as dictionaries.
+    """
+    reader = csv.reader(csv_file)
+    header = next(reader, None)
+    if header is None:
+        return
+    for row in reader:
+        if row:
+            yield dict(zip(header, row))
+
+
+def iter_csv(prefix: str, filename: str) -> Iterator[Dict[str, str]]:
+    """Iterate over rows of a CSV file as dictionaries.
+
+    Rows are read lazily so that large files need not fit in memory.
+
+    :param str prefix:
+        Directory of CSV file.
+    :param str filename:
+        Filename of CSV file.
+    :returns Iterator[Dict[str, str]]:
+        Iterator over rows of CSV file as dictionaries.
+    """
+    path = os.path.join(prefix, filename)
+    with open(path, newline='') as csv_file:
+        yield from iter_csv_rows(csv_file)
 
 
 def read_csv(prefix: str, filename: str) -> List[Dict[str, str]]:
@@ -335,15 +424,89 @@ def read_csv(prefix: str, filename: str) -> List[Dict[str, str]]:
     :returns List[Dict[str, str]]:
         List of rows of CSV file as dictionaries.
     """
-    path = os.path.join(prefix, filename)
-    with open(path) as csv_file:
-        csv_reader = csv.DictReader(csv_file)
-        return list(csv_reader)
+    return list(iter_csv(prefix, filename))
+
+
+def run_in_transaction(neo4j: Neo4j, function: Callable, *args):
+    """Call function with args in a transaction.
+
+    The transaction is retried if it fails because of a transient error, e.g.
+    a deadlock with another thread adding data concurrently. Hence, args must
+    not be consumed by function, e.g. lists instead of iterators.
+
+    :param Neo4j neo4j:
+        Neo4j instance to run transaction on.
+    :param Callable function:
+        Function which adds data to neo4j.
+    :returns:
+        The return value of function.
+    """
+    for attempt in range(1, TRANSACTION_ATTEMPTS + 1):
+        try:
+            with neo4j.transaction():
+                return function(*args)
+        except TransientError:
+            if attempt == TRANSACTION_ATTEMPTS:
+                raise
+            __log__.warning(
+                'Transaction failed (attempt %d). Retry.', attempt,
+                exc_info=True)
+
+
+def add_repository_data(
+        row: Dict[str, str], repo_details_dir: str, neo4j: Neo4j,
+        batch_size: int = BATCH_SIZE):
+    """Add data of one GIT repository to Neo4j.
+
+    The repository node, its branches, tags and relationships to apps are
+    added in one transaction. Commits are added in transactions of at most
+    COMMITS_PER_TRANSACTION commits afterwards so that the transaction state
+    of large repositories fits into the memory of Neo4j.
+
+    :param Dict[str, str] row:
+        Row of CSV file containing meta data of the repository.
+    :param str repo_details_dir:
+        Path in which CSV files with repository details, such as commits,
+        branches, etc are stored.
+    :param Neo4j neo4j:
+        Neo4j instance to add nodes to.
+    :param int batch_size:
+        Maximum number of commits, branches or tags to create with one query.
+    """
+    __log__.info('Create repo info: %s', (
+        row['id'], row['full_name'],
+        row['clone_project_id'], row['clone_project_path']))
+    packages = split_packages(row['packages'])
+    __log__.info('Found packages: %s', packages)
+    path = os.path.join(repo_details_dir, row['id'])
+
+    def _add_repository() -> int:
+        snapshots = read_csv(path, 'snapshot.csv')
+        repo_node_id = add_repository_node(row, snapshots, neo4j)
+        __log__.info(
+            'Created :GitHubRepository node with id %d', repo_node_id)
+        add_branche_nodes(
+            iter_csv(path, 'branches.csv'), repo_node_id, neo4j, batch_size)
+        __log__.info('Created :Branch nodes')
+        add_tag_nodes(
+            iter_csv(path, 'tags.csv'), repo_node_id, neo4j, batch_size)
+        __log__.info('Created :Tag nodes')
+        add_implementation_properties(
+            read_csv(path, 'paths.csv'), repo_node_id, packages, neo4j)
+        return repo_node_id
+
+    repo_node_id = run_in_transaction(neo4j, _add_repository)
+    for commits in iter_batches(
+            iter_csv(path, 'commits.csv'), COMMITS_PER_TRANSACTION):
+        run_in_transaction(
+            neo4j, add_commit_nodes, commits, repo_node_id, neo4j, batch_size)
+    __log__.info('Created :Commit nodes')
 
 
 def add_repository_info(
         csv_file: IO[str], play_details_dir: str, neo4j: Neo4j,
-        repo_details_dir: str):
+        repo_details_dir: str, threads: int = 1,
+        batch_size: int = BATCH_SIZE, processes: int = 1):
     """Add data of GIT repositories to Neo4j.
 
     :param IO[str] csv_file:
@@ -357,35 +520,58 @@ def add_repository_info(
     :param str repo_details_dir:
         Path in which CSV files with repository details, such as commits,
         branches, etc are stored.
+    :param int threads:
+        Number of threads to add repositories in. Most time is spent waiting
+        for Neo4j, so threads overlap well. Repositories are added in the
+        calling thread if this is 1.
+    :param int batch_size:
+        Maximum number of commits, branches or tags to create with one query.
+    :param int processes:
+        Number of worker processes to parse Google Play details in.
     """
-    csv_reader = csv.DictReader(csv_file)
-    for row in csv_reader:
-        __log__.info('Create repo info: %s', (
-            row['id'], row['full_name'],
-            row['clone_project_id'], row['clone_project_path']))
-        packages = row['packages'].split(',')
-        __log__.info('Found packages: %s', packages)
-        add_app_data(packages, play_details_dir, neo4j)
-
-        path = os.path.join(repo_details_dir, row['id'])
-
-        snapshots = read_csv(path, 'snapshot.csv')
-        node = add_repository_node(row, snapshots, neo4j)
-        __log__.info('Created :GitHubRepository node with id %d', node.id)
-        add_commit_nodes(read_csv(path, 'commits.csv'), node.id, neo4j)
-        __log__.info('Created :Commit nodes')
-        add_branche_nodes(read_csv(path, 'branches.csv'), node.id, neo4j)
-        __log__.info('Created :Branch nodes')
-        add_tag_nodes(read_csv(path, 'tags.csv'), node.id, neo4j)
-        __log__.info('Created :Tag nodes')
-        add_implementation_properties(
-            read_csv(path, 'paths.csv'), node.id, packages, neo4j)
+    rows = []
+    for row in iter_csv_rows(csv_file):
+        if not split_packages(row['packages']):
+            __log__.info('No packages for repo %s. Skip it.', row['id'])
+            continue
+        rows.append(row)
+
+    # Apps may be implemented in several repositories. Add their nodes once
+    # before adding repositories which link to them.
+    packages = []
+    added_packages = set()
+    for row in rows:
+        for package in split_packages(row['packages']):
+            if package not in added_packages:
+                added_packages.add(package)
+                packages.append(package)
+    with neo4j.transaction():
+        add_app_data(packages, play_details_dir, neo4j, processes)
+
+    if threads == 1:
+        for row in rows:
+            add_repository_data(row, repo_details_dir, neo4j, batch_size)
+    else:
+        with ThreadPoolExecutor(threads) as executor:
+            futures = {
+                executor.submit(
+                    add_repository_data, row, repo_details_dir, neo4j,
+                    batch_size): row['id']
+                for row in rows}
+            for future in as_completed(futures):
+                future.result()
+                __log__.info('Added repo %s', futures[future])
     add_fork_relationships(neo4j)
 
 
-def add_app_data(packages: List[str], play_details_dir: str, neo4j: Neo4j):
+def add_app_data(
+        packages: List[str], play_details_dir: str, neo4j: Neo4j,
+        processes: int = 1):
     """Create nodes and relationships for Android apps.
 
+    Google Play details of all packages are parsed first, in worker
+    processes if requested. Then nodes are created in batches.
+
     :param List[str] packages:
         List of package names to create :App and :GooglePlayPage nodes for.
     :param str play_details_dir:
@@ -394,15 +580,37 @@ def add_app_data(packages: List[str], play_details_dir: str, neo4j: Neo4j):
         assumed to be package name for details contained in file.
     :param Neo4j neo4j:
         Neo4j instance to add nodes to.
+    :param int processes:
+        Number of worker processes to parse Google Play details in.
     """
+    available = list_packages_with_details(play_details_dir)
+    available.update(list_packages_with_details(
+        os.path.join(play_details_dir, 'categories')))
+    with_details = []
     for package in packages:
         __log__.info(
             'Add :GooglePlayPage and :App nodes for package: %s', package)
-        add_google_play_page_node(package, neo4j, play_details_dir)
-        neo4j.run(
-            '''MERGE (g:GooglePlayPage {docId: {package}})
-            CREATE (a:App {id: {package}})-[:PUBLISHED_AT]->(g)''',
-            package=package)
+        if package not in available:
+            __log__.warning(
+                'Cannot create GooglePlayPage node %s.', package)
+            continue
+        with_details.append(package)
+
+    details_dirs = itertools.repeat(play_details_dir)
+    if processes == 1:
+        pages = [
+            intern_google_play_info(page) for page in map(
+                parse_google_play_info, with_details, details_dirs)]
+    else:
+        with ProcessPoolExecutor(processes) as executor:
+            # Pages arrive unpickled. Intern their strings in this process.
+            pages = [
+                intern_google_play_info(page) for page in executor.map(
+                    parse_google_play_info, with_details, details_dirs,
+                    chunksize=64)]
+    neo4j.run_batched(
+        QUERY_GOOGLE_PLAY_PAGE_NODES, (page for page in pages if page))
+    neo4j.run_batched(QUERY_APP_NODES, packages)
 
 
 def define_cmdline_arguments(parser: argparse.ArgumentParser):
@@ -424,6 +632,17 @@ def define_cmdline_arguments(parser: argparse.ArgumentParser):
     parser.add_argument(
         '--neo4j-port', type=int, default=NEO4J_PORT,
         help='Port number of Neo4j instance. Default: {}'.format(NEO4J_PORT))
+    parser.add_argument(
+        '--threads', type=int, default=1,
+        help='Number of threads to add repositories in. Default: 1.')
+    parser.add_argument(
+        '--processes', type=int, default=1,
+        help='''Number of processes to parse Google Play details in.
+        Default: 1.''')
+    parser.add_argument(
+        '--batch-size', type=int, default=BATCH_SIZE,
+        help='''Maximum number of commits, branches or tags sent to Neo4j
+        in one query. Default: {}'''.format(BATCH_SIZE))
     parser.set_defaults(func=_main)
 
 
@@ -435,6 +654,9 @@ def _main(args: argparse.Namespace):
     __log__.info('REPOSITORY_LIST: %s', args.REPOSITORY_LIST.name)
     __log__.info('--neo4j-host: %s', args.neo4j_host)
     __log__.info('--neo4j-port: %d', args.neo4j_port)
+    __log__.info('--threads: %d', args.threads)
+    __log__.info('--processes: %d', args.processes)
+    __log__.info('--batch-size: %d', args.batch_size)
     __log__.info('------- Arguments end -------')
 
     neo4j_user = os.getenv('NEO4J_USER')
@@ -442,7 +664,15 @@ def _main(args: argparse.Namespace):
     neo4j_password = os.getenv('NEO4J_PASSWORD')
     __log__.info('Read Neo4j password from environment')
 
-    with Neo4j(NEO4J_HOST, neo4j_user, neo4j_password, NEO4J_PORT) as neo4j:
+    driver_config = dict(DRIVER_CONFIG)
+    driver_config['max_connection_pool_size'] = max(
+        driver_config['max_connection_pool_size'], 2 * args.threads)
+
+    with Neo4j(
+            args.neo4j_host, neo4j_user, neo4j_password,
+            args.neo4j_port, **driver_config) as neo4j:
+        ensure_indexes(neo4j)
         add_repository_info(
             args.REPOSITORY_LIST, args.PLAY_STORE_DETAILS_DIR, neo4j,
-            args.REPO_DETAILS_DIR)
+            args.REPO_DETAILS_DIR, args.threads, args.batch_size,
+            args.processes)
@@ -6,17 +6,19 @@ not available. Temporarily store all data in CSV files.
 Use -h or --help for more information.
 """
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 import csv
-import itertools
+import fnmatch
 import logging
 import os
-from typing import Dict, IO, Iterable, Iterator, List
+import re
+from typing import Dict, Hashable, IO, Iterable, Iterator, List, Tuple
 
 from gitlab import Gitlab, GitlabGetError
 from gitlab.v4.objects import Project
 
 from util.bare_git import BareGit, GitHistory
-from util.parse import parse_iso8601
+from util.parse import split_packages
 
 
 __log__ = logging.getLogger(__name__)
@@ -24,6 +26,16 @@ __log__ = logging.getLogger(__name__)
 
 GITLAB_HOST = 'http://145.108.225.21'
 GITLAB_REPOSITORY_PATH = '/var/opt/gitlab/git-data/repositories/gitlab'
+# Gitlab returns 20 items per page by default.
+GITLAB_PAGE_SIZE = 100
+# Files which declare the package name of an app. Each entry consists of the
+# name of the property to store paths in, a pathspec and a search pattern
+# with a placeholder for the escaped package name.
+IMPLEMENTATION_FILES = [
+    ('manifestPaths', '*AndroidManifest.xml', 'package="{}"'),
+    ('gradleConfigPaths', '*build.gradle', 'applicationId *.{}.'),
+    ('mavenConfigPaths', '*pom.xml', r'<groupId>{}<\/groupId>'),
+    ]
 
 
 def iter_tags(gitlab_project: Project) -> Iterator[str]:
@@ -57,108 +69,96 @@ def iter_branches(gitlab_project: Project) -> Iterator[str]:
             }
 
 
-def find_paths(pattern: str, file_pattern: str, branch: str, git: BareGit):
-    """Find files in GIT repository.
-
-    :param str pattern:
-        Search pattern.
-    :param str file_pattern:
-        Pathspec to restrict files matched in GIT repository.
-    :param str branch:
-        Refspec to base search in GIT repository on.
-    :param BareGit git:
-        GIT repository to search.
-    :returns List[str]:
-        list of path names.
-    """
-    if not branch:
-        __log__.warning('Branch is None for %s', git.git_dir)
-        return []
-    search_results = git.grep(pattern, branch, file_pattern, ['--name-only'])
-    paths = sorted(map(lambda m: m[1], search_results))
-    groups = itertools.groupby(paths)
-    return [group[0] for group in groups]
+def list_refs(
+        gitlab_project: Project) -> Tuple[List[dict], List[dict]]:
+    """Get branches and tags of gitlab_project.
 
+    Branches and tags are requested one after the other because all
+    requests of a Gitlab instance share one requests.Session, which is not
+    safe to use from several threads at once.
 
-def find_manifest_paths(
-        package_name: str, branch: str, git: BareGit) -> List[str]:
-    """Find paths of AndroidManifest.xml files in git repository.
-
-    :param str package_name:
-        Package name of :App node.
-    :param str branch:
-        Refspec to base search in GIT repository on.
-    :param BareGit git:
-        GIT repository to search.
-    :returns List[str]:
-        List of paths to AndroidManifest.xml files for package_name.
+    :param gitlab.v4.object.Project gitlab_project:
+        Gitlab project to retrieve branches and tags from.
+    :returns Tuple[List[dict], List[dict]]:
+        Branch data and tag data to store in CSV files.
     """
-    pattern = 'package="{}"'.format(package_name)
-    return find_paths(pattern, '*AndroidManifest.xml', branch, git)
+    return list(iter_branches(gitlab_project)), list(iter_tags(gitlab_project))
 
 
-def find_gradle_config_paths(
-        package_name: str, branch: str, git: BareGit) -> List[str]:
-    """Find paths of gradle configuration files in git repository.
-
-    :param str package_name:
-        Package name of :App node.
-    :param str branch:
-        Refspec to base search in GIT repository on.
-    :param BareGit git:
-        GIT repository to search.
-    :returns List[str]:
-        List of paths to build.gradle files for package_name as applicationId.
-    """
-    pattern = 'applicationId *.{}.'.format(package_name)
-    return find_paths(pattern, '*build.gradle', branch, git)
-
+def find_paths(
+        patterns: Dict[Hashable, Tuple[str, str]], branch: str,
+        git: BareGit) -> Dict[Hashable, List[str]]:
+    """Find files in GIT repository.
 
-def find_maven_config_paths(
-        package_name: str, branch: str, git: BareGit) -> List[str]:
-    """Find paths of Maven configuration files in git repository.
+    Searches for all patterns with a single `git grep`. Matching lines are
+    attributed to patterns afterwards.
 
-    :param str package_name:
-        Package name of :App node.
+    :param Dict[Hashable, Tuple[str, str]] patterns:
+        Mapping of keys to pairs of a pathspec and a search pattern. Only
+        files matching the pathspec are searched for the pattern.
     :param str branch:
         Refspec to base search in GIT repository on.
     :param BareGit git:
         GIT repository to search.
-    :returns List[str]:
-        List of paths to pom.xml files with package name as groupId.
+    :returns Dict[Hashable, List[str]]:
+        Mapping of keys to list of path names which match their pattern.
     """
-    pattern = r'<groupId>{}<\/groupId>'.format(package_name)
-    return find_paths(pattern, '*pom.xml', branch, git)
+    if not branch:
+        __log__.warning('Branch is None for %s', git.git_dir)
+        return {key: [] for key in patterns}
+    if not patterns:
+        return {}
+    found = {key: set() for key in patterns}
+    # Search patterns are basic regular expressions which Python's re module
+    # interprets the same way for package names.
+    regexes_by_file_pattern = {}
+    for key, (file_pattern, pattern) in patterns.items():
+        regexes_by_file_pattern.setdefault(file_pattern, []).append(
+            (key, re.compile(pattern)))
+    search_results = git.grep(
+        sorted({pattern for _, pattern in patterns.values()}), branch,
+        sorted(regexes_by_file_pattern))
+    for _, path, line in search_results:
+        for file_pattern, regexes in regexes_by_file_pattern.items():
+            # Pathspecs with wildcards match across directories like fnmatch.
+            if not fnmatch.fnmatchcase(path, file_pattern):
+                continue
+            for key, regex in regexes:
+                if regex.search(line):
+                    found[key].add(path)
+    return {key: sorted(paths) for key, paths in found.items()}
 
 
 def iter_implementation_properties(
-        project: Project, packages: List[str],
+        branch: str, packages: List[str],
         git: BareGit) -> Iterator[Dict[str, str]]:
     """Iterator over package with paths found in project.
 
     Find Android manifest files and build system files for app in the
-    repository.
+    repository. The files are searched for package names as declared in
+    IMPLEMENTATION_FILES.
 
-    :param gitlab.v4.object.Project gitlab_project:
-        Gitlab project to search.
+    :param str branch:
+        Refspec to base search in GIT repository on, usually the default
+        branch of the Gitlab project.
     :param List[str] packages:
         A list of package names to be connected with the repository identified
         by repo_node_id.
-    :param str gitlab_repo_prefix:
-        Prefix to paths of bare Git repositories of Gitlab on disk.
+    :param BareGit git:
+        GIT repository to search.
     :returns Iterator[Dict[str, str]]:
         Iterator over dictionary with paths as comma separated lists.
     """
+    patterns = {
+        (name, package): (file_pattern, pattern.format(re.escape(package)))
+        for name, file_pattern, pattern in IMPLEMENTATION_FILES
+        for package in packages}
+    paths = find_paths(patterns, branch, git)
     for package in packages:
-        manifest = find_manifest_paths(package, project.default_branch, git)
-        gradle = find_gradle_config_paths(package, project.default_branch, git)
-        maven = find_maven_config_paths(package, project.default_branch, git)
-        yield {
-            'package': package,
-            'manifestPaths': ','.join(manifest),
-            'gradleConfigPaths': ','.join(gradle),
-            'mavenConfigPaths': ','.join(maven),
-            }
+        properties = {'package': package}
+        for name, _, _ in IMPLEMENTATION_FILES:
+            properties[name] = ','.join(paths[name, package])
+        yield properties
 
 
 def write_csv(
@@ -183,8 +183,14 @@ def store_repository_info(csv_file: IO[str], gitlab: Gitlab, outdir: str):
     :param Gitlab gitlab:
         Gitlab instance to query repository data from.
     """
-    csv_reader = csv.DictReader(csv_file)
-    for row in csv_reader:
+    rows = []
+    for row in csv.DictReader(csv_file):
+        if not split_packages(row['packages']):
+            __log__.info('No packages for repo %s. Skip it.', row['id'])
+            continue
+        rows.append(row)
+    projects = list_projects(gitlab)
+    for row in rows:
         __log__.info('Repo info: %s', (
             row['id'], row['full_name'],
             row['clone_project_id'], row['clone_project_path']))
@@ -192,55 +198,119 @@ def store_repository_info(csv_file: IO[str], gitlab: Gitlab, outdir: str):
         repo_dir = os.path.join(outdir, row['id'])
         os.makedirs(repo_dir)
 
-        packages = row['packages'].split(',')
-
-        try:
-            project = gitlab.projects.get(int(row['clone_project_id']))
-        except GitlabGetError as error:
-            __log__.exception(
-                'Could not get Gitlab project with ID: %s',
-                row['clone_project_id'])
-            __log__.error('These are repository details: %s', row)
-            __log__.error('%s\n%s', error, error.response_body)
+        project = projects.get(int(row['clone_project_id']))
+        if project is None:
+            project = get_project(row, gitlab)
+        if project is None:
             continue
+        store_project_data(row, project, gitlab, repo_dir)
+
+
+def list_projects(gitlab: Gitlab) -> Dict[int, Project]:
+    """Get all Gitlab projects visible to the client.
 
-        repository_path = os.path.join(
-            gitlab.repository_prefix, '{}.git'.format(project.path))
-        __log__.info('Use local git repository at %s', repository_path)
-        git = GitHistory(repository_path)
-
-        write_csv(
-            repo_dir, 'snapshot.csv',
-            ['web_url', 'created_at'],
-            [{'web_url': project.web_url, 'created_at': project.created_at}])
-
-        write_csv(
-            repo_dir, 'commits.csv',
-            [
-                'id', 'short_id', 'title', 'message', 'additions',
-                'deletions', 'total', 'author_name', 'author_email',
-                'committer_name', 'committer_email', 'authored_date',
-                'committed_date', 'parent_ids'
-            ],
-            git.iter_commits())
-
-        write_csv(
-            repo_dir, 'branches.csv',
-            ['commit_hash', 'branch_name'],
-            iter_branches(project))
-
-        write_csv(
-            repo_dir, 'tags.csv',
-            ['commit_hash', 'tag_name', 'tag_message'],
-            iter_tags(project))
-
-        write_csv(
-            repo_dir, 'paths.csv',
-            [
-                'package', 'manifestPaths', 'gradleConfigPaths',
-                'mavenConfigPaths'
-            ],
-            iter_implementation_properties(project, packages, git))
+    Listing projects needs one request per page of projects instead of one
+    request per project.
+
+    :param Gitlab gitlab:
+        Gitlab instance to query projects from.
+    :returns Dict[int, gitlab.v4.object.Project]:
+        Mapping of project IDs to projects.
+    """
+    return {
+        project.id: project
+        for project in gitlab.projects.list(
+            all=True, as_list=False, per_page=GITLAB_PAGE_SIZE)}
+
+
+def get_project(row: Dict[str, str], gitlab: Gitlab) -> Project:
+    """Get Gitlab project which hosts the snapshot of a repository.
+
+    :param Dict[str, str] row:
+        Meta data of the repository.
+    :param Gitlab gitlab:
+        Gitlab instance to query repository data from.
+    :returns gitlab.v4.object.Project:
+        The Gitlab project or None if it cannot be retrieved.
+    """
+    try:
+        return gitlab.projects.get(int(row['clone_project_id']))
+    except GitlabGetError as error:
+        __log__.exception(
+            'Could not get Gitlab project with ID: %s',
+            row['clone_project_id'])
+        __log__.error('These are repository details: %s', row)
+        __log__.error('%s\n%s', error, error.response_body)
+        return None
+
+
+def store_project_data(
+        row: Dict[str, str], project: Project, gitlab: Gitlab,
+        repo_dir: str):
+    """Store data of one repository in CSV files in repo_dir.
+
+    :param Dict[str, str] row:
+        Meta data of the repository.
+    :param gitlab.v4.object.Project project:
+        Gitlab project which hosts the snapshot of the repository.
+    :param Gitlab gitlab:
+        Gitlab instance the project belongs to.
+    :param str repo_dir:
+        Directory to write CSV files to.
+    """
+    packages = split_packages(row['packages'])
+    default_branch = project.default_branch
+
+    repository_path = os.path.join(
+        gitlab.repository_prefix, '{}.git'.format(project.path))
+    __log__.info('Use local git repository at %s', repository_path)
+    git = GitHistory(repository_path)
+
+    # Request branches and tags from Gitlab and search for implementation
+    # files while the local history is read. All data is collected before
+    # any file is written, so that a failure leaves no partial output.
+    # Leaving the executor waits for both workers, also on errors.
+    with ThreadPoolExecutor(2) as executor:
+        refs = executor.submit(list_refs, project)
+        paths = executor.submit(
+            list,
+            iter_implementation_properties(default_branch, packages, git))
+        commits = list(git.iter_commits())
+        branches, tags = refs.result()
+        paths = paths.result()
+
+    write_csv(
+        repo_dir, 'snapshot.csv',
+        ['web_url', 'created_at'],
+        [{'web_url': project.web_url, 'created_at': project.created_at}])
+
+    write_csv(
+        repo_dir, 'commits.csv',
+        [
+            'id', 'short_id', 'title', 'message', 'additions',
+            'deletions', 'total', 'author_name', 'author_email',
+            'committer_name', 'committer_email', 'authored_date',
+            'committed_date', 'parent_ids'
+        ],
+        commits)
+
+    write_csv(
+        repo_dir, 'branches.csv',
+        ['commit_hash', 'branch_name'],
+        branches)
+
+    write_csv(
+        repo_dir, 'tags.csv',
+        ['commit_hash', 'tag_name', 'tag_message'],
+        tags)
+
+    write_csv(
+        repo_dir, 'paths.csv',
+        [
+            'package', 'manifestPaths', 'gradleConfigPaths',
+            'mavenConfigPaths'
+        ],
+        paths)
 
 
 def define_cmdline_arguments(parser: argparse.ArgumentParser):
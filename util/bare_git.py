@@ -1,5 +1,4 @@
 """Interact with a bare Git repository."""
-from datetime import datetime
 import logging
 import re
 import subprocess
@@ -112,7 +111,8 @@ class BareGit(object):
         """Turn git grep output into tuples of (ref, path, match)."""
         try:
             for line in output.splitlines():
-                match = self.REGEX_GREP_OUTPUT.match(line.decode())
+                match = self.REGEX_GREP_OUTPUT.match(
+                    line.decode(errors='replace'))
                 # TODO: Find out how to match the colon at the beginning of the
                 #       non-capturing group, so that match.group(3) does not
                 #       contain the initial colon.
@@ -143,11 +143,13 @@ class BareGit(object):
         []
 
         :param str pattern:
-            The search pattern.
+            The search pattern. May be a list of patterns to search for lines
+            matching any of them.
         :param str treespec:
             A treespec to search, e.g. a branch or a commit hash.
         :param str pathspec:
-            An optional constraint on which files to search.
+            An optional constraint on which files to search. May be a list of
+            pathspecs to search files matching any of them.
         :param list options:
             List of options to the subcommand.
         :param list git_options:
@@ -160,9 +162,14 @@ class BareGit(object):
             options = []
         if not git_options:
             git_options = []
-        options += [self.OPTION_PATTERN, self._avoid_glob(pattern), treespec]
+        patterns = [pattern] if isinstance(pattern, str) else pattern
+        for single_pattern in patterns:
+            options += [self.OPTION_PATTERN, self._avoid_glob(single_pattern)]
+        options.append(treespec)
         if pathspec:
-            options += [self.OPTIONS_END, self._avoid_glob(pathspec)]
+            pathspecs = [pathspec] if isinstance(pathspec, str) else pathspec
+            options.append(self.OPTIONS_END)
+            options += [self._avoid_glob(spec) for spec in pathspecs]
         output, status = self.git(self.COMMAND_GREP, options, git_options)
         if status == 1:
             __log__.info('Status code 1: git grep returned no results')
@@ -7,14 +7,39 @@ Example:
 >>>     print(greeting.get('formal'))
 'Good evening'
 """
+import contextlib
+import itertools
+import threading
+from typing import Iterable, Iterator
 
 from neo4j.v1 import GraphDatabase, Session, StatementResult
 from neo4j.v1 import Node, Relationship
 
 
+BATCH_SIZE = 1000
+
+
+def iter_batches(
+        rows: Iterable, batch_size: int = BATCH_SIZE) -> Iterator[list]:
+    """Split rows into lists of at most batch_size items.
+
+    Example:
+    >>> list(iter_batches(range(5), 2))
+    [[0, 1], [2, 3], [4]]
+    """
+    rows = iter(rows)
+    batch = list(itertools.islice(rows, batch_size))
+    while batch:
+        yield batch
+        batch = list(itertools.islice(rows, batch_size))
+
+
 class Neo4j(object):
     """Convenience wrapper for neo4j.v1.GraphDatabase.
 
+    An instance may be shared by several threads. Each thread runs its
+    queries in a session and transaction of its own.
+
     :param str uri:
         URI of the database.
     :param str user:
@@ -23,15 +48,26 @@ class Neo4j(object):
         Password for authenticating against Neo4j instance.
     :param int port:
         Port number. Default: 7687.
+    :param config:
+        Keyword arguments passed on to the driver, e.g. the connection pool
+        settings max_connection_pool_size and max_connection_lifetime.
     """
-    def __init__(self, uri: str, user: str, password: str, port: int = 7687):
+    def __init__(
+            self, uri: str, user: str, password: str, port: int = 7687,
+            **config):
         self._driver = GraphDatabase.driver(
-            '{}:{}'.format(uri, port), auth=(user, password))
+            '{}:{}'.format(uri, port), auth=(user, password), **config)
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
 
     def __enter__(self):
         return self
 
     def __exit__(self, *args):
+        with self._sessions_lock:
+            for session in self._sessions:
+                session.close()
         self._driver.close()
 
     def session(self) -> Session:
@@ -44,11 +80,45 @@ class Neo4j(object):
         """
         return self._driver.session()
 
+    def _shared_session(self) -> Session:
+        """Session reused by run() and transaction() of the current thread.
+
+        Opened on first use and closed with the driver.
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._driver.session()
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Run all queries inside the with block in one transaction.
+
+        The transaction is committed when the block is left and rolled back
+        if it raises an exception.
+
+        Example:
+        >>> with neo4j.transaction():
+        >>>     neo4j.create_node('Greeting', formal='Good evening')
+        >>>     neo4j.create_node('Greeting', formal='Good morning')
+        """
+        session = self._shared_session()
+        with session.begin_transaction() as transaction:
+            self._local.transaction = transaction
+            try:
+                yield transaction
+            finally:
+                self._local.transaction = None
+
     def run(self, query: str, **kwargs) -> StatementResult:
         """Execute a query.
 
-        Opens a new session and runs query on it with **kwargs used for
-        parameter substition.
+        Runs query in the current transaction if inside a transaction() block.
+        Otherwise runs query on a session shared by all calls of the current
+        thread. **kwargs are used for parameter substition.
 
         :param str query:
             Query to execute. May contain variables enclosed in curly braces
@@ -58,8 +128,32 @@ class Neo4j(object):
         :returns neo4j.v1.StatementResult:
             the result.
         """
-        with self.session() as session:
-            return session.run(query, parameters=kwargs)
+        transaction = getattr(self._local, 'transaction', None)
+        if transaction is not None:
+            return transaction.run(query, parameters=kwargs)
+        return self._shared_session().run(query, parameters=kwargs)
+
+    def run_batched(
+            self, query: str, rows: Iterable[dict],
+            batch_size: int = BATCH_SIZE, **kwargs):
+        """Execute a query once per batch of rows.
+
+        The query receives each batch as parameter `rows` and is expected
+        to `UNWIND {rows} AS row`. This saves a round-trip and a commit per
+        row.
+
+        :param str query:
+            Query to execute for each batch.
+        :param Iterable[dict] rows:
+            Parameters of each row.
+        :param int batch_size:
+            Maximum number of rows to send with one query.
+        :param kwargs:
+            Keywoard arguments used for variable substitution in query in
+            addition to rows.
+        """
+        for batch in iter_batches(rows, batch_size):
+            self.run(query, rows=batch, **kwargs)
 
     def create_node(self, label: str, **kwproperties) -> Node:
         """Create a new node.
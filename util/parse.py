@@ -1,16 +1,23 @@
 """Parse intermediary files for further processing."""
 
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import csv
-from datetime import datetime
-import glob
+from datetime import date, datetime, time
+import functools
+import itertools
 import json
 import logging
+from operator import itemgetter
 import os
 import re
+import sys
 from typing import \
     Dict, \
+    FrozenSet, \
     Generator, \
     IO, \
+    Iterable, \
     List, \
     Mapping, \
     Sequence, \
@@ -30,6 +37,15 @@ TIME_FORMAT = '%Y-%m-%dT%H:%M:%S%z'
 TIMESTAMP_PATTERN = re.compile(
     r'(\d+-\d+-\d+T\d+:\d+:\d+)\.?\d*([-\+Z])((\d+):(\d+))?')
 GITLAB_KEYS = ['clone_project_name', 'clone_project_id']
+MONTHS = {
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12}
+# Many apps share upload dates and many repositories share timestamps of
+# snapshots. Parsing them is expensive enough to remember results.
+DATE_CACHE_SIZE = 65536
+# Number of files parsed per task of a worker process.
+PARSE_CHUNK_SIZE = 64
+READ_THREADS = 8
 
 
 def parse_package_to_repos_file(input_file: IO[str]) -> Dict[str, List[str]]:
@@ -43,30 +59,295 @@ def parse_package_to_repos_file(input_file: IO[str]) -> Dict[str, List[str]]:
     :returns Dict[str, List[str]]: A mapping from package name to
         list of repository names.
     """
+    reader = csv.reader(input_file)
+    header = next(reader, [])
+    package_index = header.index('package')
+    repos_index = header.index('all_repos')
     return {
-        row['package']: row['all_repos'].split(';')
-        for row in csv.DictReader(input_file)
+        row[package_index]: row[repos_index].split(';')
+        for row in reader if row
         }
 
 
-def parse_package_details(details_dir: str) -> Generator[
-        Tuple[str, ParsedJSON], None, None]:
+def _load_json_file(path: str) -> ParsedJSON:
+    """Parse JSON file at path.
+
+    Decoding bytes in json.loads skips the text layer of open() and the
+    chunked reads of json.load.
+    """
+    with open(path, 'rb') as json_file:
+        return json.loads(json_file.read())
+
+
+def _iter_details_files(
+        details_dir: str, packages: Set[str] = None) -> Generator[
+            Tuple[str, str], None, None]:
+    """Find JSON files in details_dir.
+
+    Uses os.scandir() so that file types come with the directory listing
+    instead of one stat() call per file.
+
+    :param str details_dir: Directory to include JSON files from.
+    :param Set[str] packages: If given, only files of these package names are
+        included.
+    :returns Generator[Tuple[str, str]]: Generator over tuples of package
+        name and path of the JSON file.
+    """
+    with os.scandir(details_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith('.') or not entry.name.endswith('.json'):
+                continue
+            package_name = entry.name[:-len('.json')]
+            if packages is not None and package_name not in packages:
+                continue
+            if entry.is_file():
+                yield package_name, entry.path
+
+
+def list_packages_with_details(details_dir: str) -> Set[str]:
+    """Package names of all JSON files in details_dir.
+
+    Lists the directory once so that callers need not check for each file
+    whether it exists.
+
+    :param str details_dir: Directory to include JSON files from.
+    :returns Set[str]: Set of package names. Empty if details_dir does not
+        exist.
+    """
+    if not os.path.isdir(details_dir):
+        return set()
+    return {package_name for package_name, _ in _iter_details_files(
+        details_dir)}
+
+
+@functools.lru_cache(maxsize=None)
+def _listed_json_files(details_dir: str) -> FrozenSet[str]:
+    """File names of all JSON files in details_dir, listed only once.
+
+    The listing is kept for the lifetime of the process. Files added to
+    details_dir later are not seen.
+    """
+    return frozenset(
+        '{}.json'.format(package_name)
+        for package_name in list_packages_with_details(details_dir))
+
+
+def parse_package_details(
+        details_dir: str, packages: Set[str] = None) -> Generator[
+            Tuple[str, ParsedJSON], None, None]:
     """Parse all JSON files in details_dir.
 
     Filenames need to have .json extension. Filename without extension is
     assumed to be package name for details contained in file.
 
     :param str details_dir: Directory to include JSON files from.
+    :param Set[str] packages: If given, only files of these package names are
+        parsed. Other files are skipped without opening them.
     :returns Generator[Tuple[str, ParsedJSON]]: Generator over tuples of
         package name and parsed JSON.
     """
-    for path in glob.iglob('{}/*.json'.format(details_dir)):
-        if os.path.isfile(path):
-            with open(path, 'r') as details_file:
-                filename = os.path.basename(path)
-                package_name = os.path.splitext(filename)[0]
-                package_details = json.load(details_file)
-                yield package_name, package_details
+    for package_name, path in _iter_details_files(details_dir, packages):
+        yield package_name, _load_json_file(path)
+
+
+def parse_package_details_parallel(
+        details_dir: str, packages: Set[str] = None,
+        threads: int = READ_THREADS) -> Generator[
+            Tuple[str, ParsedJSON], None, None]:
+    """Parse all JSON files in details_dir reading several at a time.
+
+    Like parse_package_details, but up to twice as many files as threads
+    are read ahead of the caller. Files are yielded in the same order.
+
+    :param str details_dir: Directory to include JSON files from.
+    :param Set[str] packages: If given, only files of these package names are
+        parsed. Other files are skipped without opening them.
+    :param int threads: Number of threads to read files in.
+    :returns Generator[Tuple[str, ParsedJSON]]: Generator over tuples of
+        package name and parsed JSON.
+    """
+    pending = deque()
+    with ThreadPoolExecutor(threads) as executor:
+        for package_name, path in _iter_details_files(details_dir, packages):
+            pending.append(
+                (package_name, executor.submit(_load_json_file, path)))
+            if len(pending) >= 2 * threads:
+                package_name, future = pending.popleft()
+                yield package_name, future.result()
+        while pending:
+            package_name, future = pending.popleft()
+            yield package_name, future.result()
+
+
+def select_fields(
+        document: ParsedJSON, fields: Iterable[str]) -> Dict[str, ParsedJSON]:
+    """Select values from nested JSON objects by dotted paths.
+
+    Example:
+    >>> document = {'title': 'A',
+    ...             'details': {'appDetails': {'versionCode': 3}}}
+    >>> select_fields(document, ['title', 'details.appDetails.versionCode'])
+    {'title': 'A', 'details.appDetails.versionCode': 3}
+    >>> select_fields(document, ['details.appDetails.uploadDate'])
+    {'details.appDetails.uploadDate': None}
+
+    :param ParsedJSON document: Parsed JSON to select values from.
+    :param Iterable[str] fields: Paths of values to select. Path segments
+        are keys of nested objects separated by dots.
+    :returns Dict[str, ParsedJSON]: Mapping from path to selected value or
+        None if the path does not exist in document.
+    """
+    selected = {}
+    for field in fields:
+        value = document
+        for key in field.split('.'):
+            value = value.get(key) if isinstance(value, dict) else None
+        selected[field] = value
+    return selected
+
+
+def _parse_package_fields(
+        details_file: Tuple[str, str],
+        fields: List[str]) -> Tuple[str, Dict[str, ParsedJSON]]:
+    """Parse JSON file and select fields from it.
+
+    details_file is a tuple of package name and path as generated by
+    _iter_details_files(). Module level function so that it can be run in
+    worker processes.
+    """
+    package_name, path = details_file
+    package_details = _load_json_file(path)
+    if not package_details:
+        return package_name, None
+    return package_name, select_fields(package_details, fields)
+
+
+def _parse_package_fields_chunk(
+        details_files: List[Tuple[str, str]],
+        fields: List[str]) -> List[Tuple[str, Dict[str, ParsedJSON]]]:
+    """Run _parse_package_fields() for several files in one task."""
+    return [
+        _parse_package_fields(details_file, fields)
+        for details_file in details_files]
+
+
+def parse_package_details_fields(
+        details_dir: str, fields: Iterable[str], processes: int = 1,
+        packages: Set[str] = None) -> Generator[
+            Tuple[str, Dict[str, ParsedJSON]], None, None]:
+    """Parse selected fields of all JSON files in details_dir.
+
+    Only the values of fields are kept. The remainder of each parsed file is
+    discarded right away.
+
+    :param str details_dir: Directory to include JSON files from.
+    :param Iterable[str] fields: Paths of values to select. See
+        select_fields().
+    :param int processes: Number of worker processes to parse files in.
+        Files are parsed in the calling process if this is 1. Otherwise a
+        few chunks of files are parsed ahead of the caller. Chunks which have
+        not been started are cancelled when the generator is closed.
+    :param Set[str] packages: If given, only files of these package names are
+        parsed. Other files are skipped without opening them.
+    :returns Generator[Tuple[str, Dict[str, ParsedJSON]]]: Generator over
+        tuples of package name and selected values. Selected values are None
+        if the JSON file does not contain any details.
+    """
+    details_files = _iter_details_files(details_dir, packages)
+    fields = list(fields)
+    if processes == 1:
+        yield from map(
+            functools.partial(_parse_package_fields, fields=fields),
+            details_files)
+        return
+    parse_chunk = functools.partial(
+        _parse_package_fields_chunk, fields=fields)
+    # Unlike executor.map(), submit only a few chunks ahead of the caller,
+    # so that a caller which stops early does not list and parse all files.
+    chunks = iter(
+        lambda: list(itertools.islice(details_files, PARSE_CHUNK_SIZE)), [])
+    pending = deque()
+    with ProcessPoolExecutor(processes) as executor:
+        try:
+            for chunk in chunks:
+                pending.append(executor.submit(parse_chunk, chunk))
+                if len(pending) >= 2 * processes:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def write_package_details_jsonl(
+        details_dir: str, output: IO[str], packages: Set[str] = None) -> int:
+    """Concatenate JSON files in details_dir into one JSON lines file.
+
+    Every line of output is an object with the keys `package` and `details`
+    holding the package name and the parsed content of its JSON file.
+
+    :param str details_dir: Directory to include JSON files from.
+    :param IO[str] output: File to write JSON lines to.
+    :param Set[str] packages: If given, only files of these package names are
+        included.
+    :returns int: Number of lines written.
+    """
+    count = 0
+    for package_name, package_details in parse_package_details(
+            details_dir, packages):
+        record = {'package': package_name, 'details': package_details}
+        json.dump(record, output)
+        output.write('\n')
+        count += 1
+    return count
+
+
+def parse_package_details_jsonl(
+        jsonl_path: str, fields: Iterable[str],
+        packages: Set[str] = None) -> Generator[
+            Tuple[str, Dict[str, ParsedJSON]], None, None]:
+    """Parse selected fields from a JSON lines file of package details.
+
+    Reading one file sequentially avoids opening thousands of small files.
+    See write_package_details_jsonl() for the expected format.
+
+    :param str jsonl_path: Path to JSON lines file.
+    :param Iterable[str] fields: Paths of values to select. See
+        select_fields().
+    :param Set[str] packages: If given, only details of these package names
+        are yielded.
+    :returns Generator[Tuple[str, Dict[str, ParsedJSON]]]: Generator over
+        tuples of package name and selected values. Selected values are None
+        if there are no details for the package.
+    """
+    fields = list(fields)
+    with open(jsonl_path, 'rb') as jsonl_file:
+        for line in jsonl_file:
+            record = json.loads(line)
+            package_name = record['package']
+            if packages is not None and package_name not in packages:
+                continue
+            package_details = record['details']
+            if not package_details:
+                yield package_name, None
+            else:
+                yield package_name, select_fields(package_details, fields)
+
+
+def split_packages(packages: str) -> List[str]:
+    """Split comma separated package names and drop empty ones.
+
+    Example:
+    >>> split_packages('com.a,,com.b')
+    ['com.a', 'com.b']
+    >>> split_packages('')
+    []
+
+    :param str packages: Comma separated list of package names.
+    :returns List[str]: List of non-empty package names.
+    """
+    return [package for package in packages.split(',') if package]
 
 
 def invert_mapping(packages: Mapping[str, Sequence[str]]) -> Dict[
@@ -78,11 +359,11 @@ def invert_mapping(packages: Mapping[str, Sequence[str]]) -> Dict[
     :returns Dict[str, Set[str]]: Mapping of repositories to set of package
         names.
     """
-    result = {}
+    result = defaultdict(set)
     for package, repos in packages.items():
         for repo in repos:
-            result.setdefault(repo, set()).add(package)
-    return result
+            result[repo].add(package)
+    return dict(result)
 
 
 def parse_repo_to_package_file(input_file: IO[str]) -> Dict[str, Set[str]]:
@@ -95,10 +376,10 @@ def parse_repo_to_package_file(input_file: IO[str]) -> Dict[str, Set[str]]:
         A mapping from repository name to set of package names in that
         repository.
     """
-    result = {}
+    result = defaultdict(set)
     for row in csv.reader(input_file):
-        result.setdefault(row[1], set()).add(row[0])
-    return result
+        result[row[1]].add(row[0])
+    return dict(result)
 
 
 def describe_in_app_purchases(meta_data: ParsedJSON) -> str:
@@ -117,6 +398,32 @@ def describe_in_app_purchases(meta_data: ParsedJSON) -> str:
     return None
 
 
+def parse_play_date(date_string: str) -> date:
+    """Parse a date as formatted on Google Play.
+
+    Same result as datetime.strptime(date_string, '%b %d, %Y').date() but
+    avoids the overhead of strptime for this fixed format.
+
+    Example:
+    >>> parse_play_date('Mar 5, 2017')
+    datetime.date(2017, 3, 5)
+    >>> parse_play_date('Dec 24, 2012')
+    datetime.date(2012, 12, 24)
+
+    :param str date_string:
+        Date in the format 'Mmm D, YYYY' with English month abbreviation.
+    :returns date:
+        The parsed date.
+    :raises ValueError:
+        if date_string is malformed.
+    """
+    try:
+        month, day, year = date_string.split(' ')
+        return date(int(year), MONTHS[month], int(day.rstrip(',')))
+    except KeyError:
+        raise ValueError('Unknown month in date: {}'.format(date_string))
+
+
 def parse_upload_date(app_details: ParsedJSON) -> float:
     """Parse upload date to POSIX timestamp
 
@@ -128,11 +435,53 @@ def parse_upload_date(app_details: ParsedJSON) -> float:
     """
     upload_date_string = app_details.get('uploadDate')
     if upload_date_string:
-        return int(datetime.strptime(
-            upload_date_string, '%b %d, %Y').timestamp())
+        return _upload_date_to_timestamp(upload_date_string)
     return None
 
 
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def _upload_date_to_timestamp(upload_date_string: str) -> int:
+    """Turn upload date as formatted on Google Play into POSIX timestamp."""
+    upload_date = parse_play_date(upload_date_string)
+    return int(datetime.combine(upload_date, time()).timestamp())
+
+
+def _read_json_file(path: str) -> Tuple[ParsedJSON, int]:
+    """Parse JSON file and return its content and modification time.
+
+    :param str path: Path to JSON file.
+    :returns Tuple[ParsedJSON, int]: Parsed JSON and POSIX timestamp of last
+        modification. An empty dict and None if the file does not exist.
+    """
+    try:
+        json_file = open(path, 'rb')
+    except FileNotFoundError:
+        __log__.warning('Cannot read file: %s.', path)
+        return {}, None
+    with json_file:
+        # Stat the open file instead of looking up path a second time.
+        mtime = int(os.fstat(json_file.fileno()).st_mtime)
+        return json.loads(json_file.read()), mtime
+
+
+def _read_listed_json_file(
+        details_dir: str, json_file_name: str) -> Tuple[ParsedJSON, int]:
+    """Parse JSON file json_file_name in details_dir.
+
+    Checks a listing of details_dir instead of accessing missing files.
+
+    :param str details_dir: Directory containing the file.
+    :param str json_file_name: Name of the file, e.g. <package_name>.json.
+    :returns Tuple[ParsedJSON, int]: Parsed JSON and POSIX timestamp of last
+        modification. An empty dict and None if the file does not exist.
+    """
+    path = os.path.join(details_dir, json_file_name)
+    if json_file_name not in _listed_json_files(details_dir):
+        __log__.warning('Cannot read file: %s.', path)
+        return {}, None
+    return _read_json_file(path)
+
+
 def parse_google_play_info(package_name: str, play_details_dir: str) -> dict:
     """Select and format data from json_file to store in node.
 
@@ -145,22 +494,70 @@ def parse_google_play_info(package_name: str, play_details_dir: str) -> dict:
     :returns dict:
         Properties of a node represinting the Google Play page of an app.
     """
-    def _parse_json_file(prefix: str) -> Tuple[dict, float]:
-        """Return parsed JSON and mdate
+    json_file_name = '{}.json'.format(package_name)
+    meta_data, mtime = _read_listed_json_file(play_details_dir, json_file_name)
+    category_data, category_mtime = _read_listed_json_file(
+        os.path.join(play_details_dir, 'categories'), json_file_name)
+    return format_google_play_info(
+        package_name, meta_data, mtime, category_data, category_mtime)
 
-        Uses prefix and package_name (from outer scope) to build path.
-        """
-        json_file_name = '{}.json'.format(package_name)
-        json_file_path = os.path.join(prefix, json_file_name)
-        if not os.path.exists(json_file_path):
-            __log__.warning('Cannot read file: %s.', json_file_path)
-            return {}, None
-        with open(json_file_path) as json_file:
-            return json.load(json_file), int(os.stat(json_file_path).st_mtime)
-
-    meta_data, mtime = _parse_json_file(play_details_dir)
-    category_data, category_mtime = _parse_json_file(os.path.join(
-        play_details_dir, 'categories'))
+
+def _intern(value: ParsedJSON) -> ParsedJSON:
+    """Intern value if it is a string.
+
+    Example:
+    >>> _intern('GAME') is _intern(''.join(['GA', 'ME']))
+    True
+    >>> _intern(23)
+    23
+    """
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def intern_google_play_info(info: dict) -> dict:
+    """Share one string object per value of often repeated properties.
+
+    Categories, currency codes, developer names and target SDK versions
+    repeat across many apps. Interning them saves memory where the
+    properties of many pages are kept together. Call it in that process:
+    strings of pages returned by worker processes are new objects after
+    unpickling.
+
+    :param dict info:
+        Properties as returned by format_google_play_info. May be None.
+    :returns dict:
+        info with interned strings.
+    """
+    if not info:
+        return info
+    for key in ['currencyCode', 'developerName', 'targetSdkVersion']:
+        info[key] = _intern(info[key])
+    if info['appCategory']:
+        info['appCategory'] = [
+            _intern(category) for category in info['appCategory']]
+    return info
+
+
+def format_google_play_info(
+        package_name: str, meta_data: ParsedJSON, mtime: int,
+        category_data: ParsedJSON = None,
+        category_mtime: int = None) -> dict:
+    """Select and format data of Google Play page to store in node.
+
+    :param str package_name:
+        Package name.
+    :param ParsedJSON meta_data:
+        Parsed JSON file with details from Google Play.
+    :param int mtime:
+        Modification time of file with details.
+    :param ParsedJSON category_data:
+        Parsed JSON file with category of the app if available.
+    :param int category_mtime:
+        Modification time of file with category.
+    :returns dict:
+        Properties of a node represinting the Google Play page of an app.
+        None if neither details nor category are available.
+    """
     if not meta_data and not category_data:
         return None
     if not meta_data:
@@ -175,9 +572,10 @@ def parse_google_play_info(package_name: str, play_details_dir: str) -> dict:
         currency_code = None
     details = meta_data.get('details', {})
     app_details = details.get('appDetails', {})
+    app_categories = app_details.get('appCategory')
     if category_data:
-        categories = app_details.setdefault('appCategory', [])
-        categories.append(category_data['appCategory'])
+        app_categories = (app_categories or []) + [
+            category_data['appCategory']]
     aggregate_rating = meta_data.get('aggregateRating')
     if not aggregate_rating:
         aggregate_rating = {}
@@ -187,7 +585,7 @@ def parse_google_play_info(package_name: str, play_details_dir: str) -> dict:
         'uri': meta_data.get('shareUrl'),
         'snapshotTimestamp': mtime,
         'title': meta_data.get('title'),
-        'appCategory': app_details.get('appCategory'),
+        'appCategory': app_categories,
         'promotionalDescription': meta_data.get('promotionalDescription'),
         'descriptionHtml': meta_data.get('descriptionHtml'),
         'translatedDescriptionHtml': meta_data.get('translatedDescriptionHtml'),
@@ -228,6 +626,7 @@ def get_latest_repo_name(meta_data: dict) -> Tuple[str, str]:
     return original_repo, None
 
 
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
 def parse_iso8601(timestamp: str) -> int:
     """Parse an ISO 8601 timestamp.
 
@@ -298,7 +697,8 @@ def read_gitlab_import_results(gitlab_import_file: IO[str]):
             continue
 
         # Turn URL into path name of repository
-        row['clone_project_path'] = os.path.basename(row['clone_project_url'])
+        row['clone_project_path'] = row['clone_project_url'].rpartition(
+            '/')[2]
         del row['clone_project_url']
 
         # Fixme: Which one is the better to store if neither of them is
@@ -347,31 +747,37 @@ def consolidate_data(
         a generator of consolidated data rows.
     """
 
-    def _correct_gitlab_data(row: dict, repo_names: Set[str]):
+    def _correct_gitlab_data(row: dict, repo_names: Sequence[str]):
         found = False
         for name in repo_names:
-            if name in mirrored_repos:
-                new = mirrored_repos[name]
-                clone_id = row.get('clone_project_id')
-                if found and clone_id != row['clone_project_id']:
-                    __log__.warning(
-                        'Repository %s has a clone already. New: %s. Old: %s',
-                        name, new, row)
-                    continue
-                for key in GITLAB_KEYS + ['clone_project_path']:
-                    row[key] = new[key]
-                row['clone_status'] = 'Success'
-                found = True
+            new = mirrored_repos.get(name)
+            if new is None:
+                continue
+            if found and new['clone_project_id'] != row['clone_project_id']:
+                __log__.warning(
+                    'Repository %s has a clone already. New: %s. Old: %s',
+                    name, new, row)
+                continue
+            for key in GITLAB_KEYS + ['clone_project_path']:
+                row[key] = new[key]
+            row['clone_status'] = 'Success'
+            found = True
 
     _used_repos = set()
     _used_packages = set()
 
-    def _find_packages(github_id: str, repo_names: Set[str]) -> str:
+    # Fallback for repositories without packages under any of their names.
+    renamed_packages = {
+        github_id: row['packages'].split(',')
+        for github_id, row in renamed_repos.items()
+        if row['packages']}  # Avoid adding the empty string
+
+    def _find_packages(github_id: str, repo_names: Sequence[str]) -> str:
         """Find packages for any of the repo_names.
 
         :param str github_id:
             ID of repository on GitHub.
-        :param Set[str] repo_names:
+        :param Sequence[str] repo_names:
             List of known names of repo.
         :returns str:
             Comma separated list of package names in this repository.
@@ -380,13 +786,12 @@ def consolidate_data(
         for name in repo_names:
             if name in _used_packages:
                 __log__.info('Repository has been used before: %s', name)
-            if name in packages_by_repo:
-                packages.update(packages_by_repo[name])
+            repo_packages = packages_by_repo.get(name)
+            if repo_packages is not None:
+                packages.update(repo_packages)
                 _used_repos.add(name)
-        if not packages and github_id in renamed_repos:
-            packages_str = renamed_repos[github_id]['packages']
-            if packages_str:  # Avoid adding the empty string
-                packages.update(packages_str.split(','))
+        if not packages:
+            packages.update(renamed_packages.get(github_id, ()))
         _used_packages.update(packages)
         return ','.join(packages)
 
@@ -429,6 +834,11 @@ def consolidate_data(
             'List lengths do not match: %d != %d', len(original),
             len(gitlab_import))
 
+    compared_keys = ['full_name', 'renamed_to', 'not_found']
+    get_compared = itemgetter(*compared_keys)
+    imported_keys = GITLAB_KEYS + ['clone_status', 'clone_project_path']
+    get_imported = itemgetter(*imported_keys)
+
     for github_id, repo_data in original.items():
         combined = {}
 
@@ -436,23 +846,30 @@ def consolidate_data(
         # encoding.
         combined.update(repo_data)
 
-        if github_id not in gitlab_import:
+        imported = gitlab_import.get(github_id)
+        if imported is None:
             __log__.warning(
                 'ID %s is not in %s', github_id, gitlab_import_file.name)
         else:
-            for key in ['full_name', 'renamed_to', 'not_found']:
-                if repo_data[key] != gitlab_import[github_id][key]:
-                    __log__.warning(
-                        'Column %s for row with ID %s differs: "%s" vs "%s"',
-                        key, github_id, repo_data[key],
-                        gitlab_import[github_id][key])
+            if get_compared(repo_data) != get_compared(imported):
+                for key in compared_keys:
+                    if repo_data[key] != imported[key]:
+                        __log__.warning(
+                            'Column %s for row with ID %s differs: '
+                            '"%s" vs "%s"',
+                            key, github_id, repo_data[key], imported[key])
 
             # Add information from initial import to Gitlab
-            for key in GITLAB_KEYS + ['clone_status', 'clone_project_path']:
-                combined[key] = gitlab_import[github_id][key]
-
-        # Some repositories have been renamed
-        repo_names = set(get_latest_repo_name(repo_data))
+            combined.update(zip(imported_keys, get_imported(imported)))
+
+        # Some repositories have been renamed. The latest name is None if
+        # the repository cannot be found anymore. The latest name comes first
+        # so that its snapshot takes precedence.
+        legacy_name, repo_name = get_latest_repo_name(repo_data)
+        if repo_name == legacy_name:
+            repo_name = None
+        repo_names = tuple(
+            name for name in (repo_name, legacy_name) if name)
 
         # Reflect that some snapshot repositories had to be recreated.
         _correct_gitlab_data(combined, repo_names)